@@ -7,10 +7,13 @@ let audioContext = null;
 let micStream = null;
 let scriptProcessor = null;
 let micEnabled = false;
-let currentResponseText = "";
 let reconnectAttempts = 0;
 let maxReconnectAttempts = 3;
 let isListening = false;
+let migrating = false;
+let drainingWs = null; // Старое соединение, которое сервер дорабатывает при миграции
+let pendingAudio = []; // Аудио, накопленное пока новое соединение не открыто
+const maxPendingAudioChunks = 300; // ~50 сек. аудио при буфере 4096 сэмплов
 
 // Проверяем и создаем аудио-элемент
 function ensureAudioElement() {
@@ -96,17 +99,37 @@ function connectToProxy(sessionData) {
     log(`🔌 Подключение к WebSocket прокси: ${wsUrl}`);
     
     const socket = new WebSocket(wsUrl);
+    // Текст ответа храним для каждого соединения отдельно,
+    // чтобы ответ старого соединения при миграции не смешивался с новым
+    let responseText = "";
     
     socket.onopen = async () => {
+      // Соединение устарело (например, пользователь нажал «Остановить»)
+      if (socket !== ws) {
+        socket.close();
+        return;
+      }
+      
       log("🔌 WebSocket подключен");
       updateStatus("Соединение установлено");
       reconnectAttempts = 0; // Сбрасываем счётчик переподключений
       
-      // Запускаем микрофон
+      if (migrating) {
+        // Отправляем аудио, накопленное во время переключения
+        migrating = false;
+        log(`🔀 Миграция завершена, отправляем накопленное аудио: ${pendingAudio.length} фрагм.`);
+        pendingAudio.forEach(message => socket.send(message));
+        pendingAudio = [];
+      }
+      
+      // Запускаем микрофон (при миграции он уже работает)
       await startMicrophone();
     };
     
     socket.onmessage = (event) => {
+      // Игнорируем события от соединений, которые уже не используются
+      if (socket !== ws && socket !== drainingWs) return;
+      
       try {
         const data = JSON.parse(event.data);
         console.log(`📦 Получено событие:`, data);
@@ -138,7 +161,7 @@ function connectToProxy(sessionData) {
           case "conversation.item.input_audio_transcription.completed":
             log(`📝 Транскрипция: ${data.transcript}`);
             updateStatus(`Вы: ${data.transcript}`);
-            currentResponseText = "";
+            responseText = "";
             break;
             
           case "response.created":
@@ -146,18 +169,27 @@ function connectToProxy(sessionData) {
             break;
             
           case "response.text.delta":
-            currentResponseText += data.delta;
+            responseText += data.delta;
             if (data.delta.trim() !== "") {
               log(`📤 ${data.delta}`);
             }
-            updateStatus(`Jarvis: ${currentResponseText}`);
+            updateStatus(`Jarvis: ${responseText}`);
             break;
             
           case "response.done":
             log("✅ Ответ завершен");
             // Синтезируем полный текст ответа через TTS API
-            if (currentResponseText.length > 0) {
-              playTextAsTTS(currentResponseText);
+            if (responseText.length > 0) {
+              playTextAsTTS(responseText);
+            }
+            break;
+            
+          case "proxy.migrate":
+            // Сервер перезапускается: переходим на новый инстанс,
+            // старое соединение сервер закроет после завершения ответа
+            log(`🔀 Сервер запросил миграцию: ${data.reason || 'перезапуск'}`);
+            if (socket === ws) {
+              startMigration();
             }
             break;
             
@@ -179,17 +211,35 @@ function connectToProxy(sessionData) {
     
     socket.onclose = (event) => {
       log(`🔌 WebSocket закрыт, код: ${event.code}, причина: ${event.reason || 'нет данных'}`);
+      
+      // Старое соединение после миграции: микрофон уже работает через новое
+      if (socket === drainingWs) {
+        drainingWs = null;
+        log("🔀 Старое соединение закрыто после миграции");
+        return;
+      }
+      
+      // Соединение уже заменено другим
+      if (socket !== ws) return;
+      
+      // Новое соединение не открылось во время миграции — пробуем еще раз
+      if (migrating) {
+        retryMigration();
+        return;
+      }
+      
+      // 1012 (Service Restart) — сервер перезапускается, переходим на новый инстанс
+      if (event.code === 1012 && micEnabled) {
+        startMigration();
+        return;
+      }
+      
       updateStatus("Соединение закрыто");
       stopMicrophone();
       
       // Пытаемся переподключиться, если соединение было закрыто неожиданно
-      if (event.code !== 1000 && event.code !== 1001 && reconnectAttempts < maxReconnectAttempts) {
-        reconnectAttempts++;
-        const timeout = reconnectAttempts * 2000;
-        log(`🔄 Попытка переподключения ${reconnectAttempts}/${maxReconnectAttempts} через ${timeout/1000} сек.`);
-        setTimeout(() => {
-          ws = connectToProxy(sessionInfo);
-        }, timeout);
+      if (event.code !== 1000 && event.code !== 1001) {
+        scheduleRetry(reconnectSession, "Попытка переподключения");
       }
     };
     
@@ -201,10 +251,108 @@ function connectToProxy(sessionData) {
   }
 }
 
+// Планирует следующую попытку с нарастающей задержкой.
+// Возвращает false, если попытки исчерпаны
+function scheduleRetry(action, label) {
+  if (reconnectAttempts >= maxReconnectAttempts) return false;
+  
+  reconnectAttempts++;
+  const timeout = reconnectAttempts * 2000;
+  log(`🔄 ${label} ${reconnectAttempts}/${maxReconnectAttempts} через ${timeout/1000} сек.`);
+  setTimeout(action, timeout);
+  return true;
+}
+
+async function reconnectSession() {
+  try {
+    // clientSecret старой сессии мог истечь, создаем новую
+    const session = await createSession();
+    ws = connectToProxy(session);
+  } catch (error) {
+    log(`❌ Не удалось переподключиться: ${error.message}`);
+    
+    // Новый инстанс может быть еще не готов — пробуем снова
+    if (!scheduleRetry(reconnectSession, "Попытка переподключения")) {
+      updateStatus("Соединение закрыто");
+    }
+  }
+}
+
+// Переход на новый инстанс сервера без остановки микрофона
+function startMigration() {
+  // Пока микрофон не запущен (например, открыт запрос доступа), мигрировать нечего:
+  // сервер закроет соединение, и сработает обычное переподключение
+  if (migrating || !micEnabled) return;
+  migrating = true;
+  pendingAudio = [];
+  reconnectAttempts = 0;
+  
+  // Старое соединение остается открытым, пока сервер не завершит текущий ответ,
+  // а аудио с микрофона копится до открытия нового соединения
+  if (ws && ws.readyState === WebSocket.OPEN) {
+    drainingWs = ws;
+  }
+  ws = null;
+  
+  migrateSession();
+}
+
+async function migrateSession() {
+  if (!micEnabled || !migrating) return;
+  
+  try {
+    updateStatus("Переключение на новый сервер...");
+    const session = await createSession();
+    
+    // Пользователь остановил сессию, пока создавалась новая
+    if (!micEnabled || !migrating) return;
+    
+    ws = connectToProxy(session);
+  } catch (error) {
+    log(`❌ Ошибка миграции: ${error.message}`);
+    retryMigration();
+  }
+}
+
+// Повтор миграции с той же задержкой, что и при обычном переподключении
+function retryMigration() {
+  if (!micEnabled || !migrating) return;
+  
+  if (!scheduleRetry(migrateSession, "Повтор миграции")) {
+    log("❌ Не удалось переключиться на новый сервер");
+    migrating = false;
+    pendingAudio = [];
+    ws = null;
+    updateStatus("Соединение закрыто");
+    stopMicrophone();
+  }
+}
+
+// Отправка аудио: во время миграции складываем в буфер
+function sendAudioChunk(base64) {
+  const message = JSON.stringify({
+    type: "input_audio_buffer.append",
+    audio: base64
+  });
+  
+  if (migrating) {
+    pendingAudio.push(message);
+    if (pendingAudio.length > maxPendingAudioChunks) {
+      pendingAudio.shift();
+    }
+    return;
+  }
+  
+  ws.send(message);
+}
+
 // ================ Управление микрофоном ================
 async function startMicrophone() {
   try {
-    if (micEnabled) return;
+    if (micEnabled) {
+      updateStatus("Микрофон активен, говорите...");
+      return;
+    }
     
     log("🎤 Запуск микрофона...");
     
@@ -244,7 +392,7 @@ async function startMicrophone() {
     let lastAudioSent = Date.now();
     
     scriptProcessor.onaudioprocess = (audioProcessingEvent) => {
-      if (ws && ws.readyState === WebSocket.OPEN) {
+      if (migrating || (ws && ws.readyState === WebSocket.OPEN)) {
         try {
           const inputBuffer = audioProcessingEvent.inputBuffer;
           const inputData = inputBuffer.getChannelData(0);
@@ -280,10 +428,7 @@ async function startMicrophone() {
               const base64 = btoa(String.fromCharCode(...new Uint8Array(binary.buffer)));
               
               // Отправляем аудиоданные только если уровень звука достаточный
-              ws.send(JSON.stringify({
-                type: "input_audio_buffer.append",
-                audio: base64
-              }));
+              sendAudioChunk(base64);
               
               if (!isSpeaking) {
                 isSpeaking = true;
@@ -578,9 +723,17 @@ document.addEventListener('DOMContentLoaded', function() {
       if (micEnabled) {
         // Если микрофон активен, останавливаем всё
         stopMicrophone();
+        migrating = false;
+        pendingAudio = [];
+        if (drainingWs) {
+          const oldSocket = drainingWs;
+          drainingWs = null;
+          oldSocket.close();
+        }
         if (ws && ws.readyState !== WebSocket.CLOSED) {
           ws.close();
         }
+        ws = null; // Закрытое пользователем соединение не переподключаем
         startBtn.textContent = "▶️ Начать";
         updateStatus("Остановлено");
       } else {